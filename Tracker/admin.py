@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Cycle, DailyLog
+from .models import Cycle, DailyLog, UserPrediction, UserSymptomStats
 
 @admin.register(Cycle)
 class CycleAdmin(admin.ModelAdmin):
@@ -12,3 +12,11 @@ class DailyLogAdmin(admin.ModelAdmin):
     list_display = ['date', 'cycle', 'flow_intensity', 'cramps', 'headache']
     list_filter = ['date', 'flow_intensity']
     search_fields = ['notes']
+
+@admin.register(UserPrediction)
+class UserPredictionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'predicted_date', 'predicted_length', 'confidence', 'updated_at']
+
+@admin.register(UserSymptomStats)
+class UserSymptomStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'total', 'cramps', 'headache', 'updated_at']
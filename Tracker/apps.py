@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TrackerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Tracker'
+
+    def ready(self):
+        # Register signal handlers that keep stored predictions up to date
+        from . import signals  # noqa: F401
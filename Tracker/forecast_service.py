@@ -2,32 +2,66 @@
 Forecast service for Django integration.
 Provides easy-to-use functions for getting cycle predictions.
 """
+import uuid
 from datetime import date, timedelta
 from typing import Optional, Tuple, List
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import (
+    Avg, Case, Count, DurationField, ExpressionWrapper, F, IntegerField, Max,
+    Q, Subquery, Value, When,
+)
+
 from .ml.model import predict_with_history
 
+# Number of most recent daily logs used to estimate typical symptoms
+RECENT_LOG_WINDOW = 30
+
+# How long a cached prediction is kept (seconds)
+PREDICTION_CACHE_TIMEOUT = 3600
+
 
-def get_user_cycle_data(user) -> Tuple[List[int], dict]:
+def get_user_cycles(user) -> list:
+    """
+    Fetch all of a user's cycles in a single query.
+    Only the columns needed for forecasting are loaded.
+    
+    Args:
+        user: Django User object
+    
+    Returns:
+        List of Cycle objects ordered by start date (most recent last)
+    """
+    from .models import Cycle
+    
+    return list(
+        Cycle.objects.filter(user=user)
+        .only('start_date', 'end_date', 'cycle_length')
+        .order_by('start_date')
+    )
+
+
+def get_user_cycle_data(user, cycles: Optional[list] = None) -> Tuple[List[int], dict]:
     """
     Extract cycle lengths and symptom data from a user's cycles.
     
     Args:
         user: Django User object
+        cycles: Optional list from get_user_cycles(), to avoid re-querying
     
     Returns:
         cycle_lengths: List of cycle lengths (most recent last)
         symptoms: Dict with aggregated symptom info
     """
-    from .models import Cycle, DailyLog
+    from .models import Cycle, DailyLog, UserSymptomStats
     
-    # Get user's completed cycles ordered by date
-    cycles = Cycle.objects.filter(
-        user=user,
-        cycle_length__isnull=False
-    ).order_by('start_date')
+    if cycles is None:
+        cycles = get_user_cycles(user)
     
-    cycle_lengths = [c.cycle_length for c in cycles if c.cycle_length]
+    # Only completed cycles carry a length
+    completed_cycles = [c for c in cycles if c.cycle_length]
+    cycle_lengths = [c.cycle_length for c in completed_cycles]
     
     # Aggregate symptoms from daily logs
     symptoms = {
@@ -40,52 +74,238 @@ def get_user_cycle_data(user) -> Tuple[List[int], dict]:
         'period_length': 5,  # Default 5 days
     }
     
-    # Get recent logs to determine typical symptoms
-    recent_logs = DailyLog.objects.filter(
-        cycle__user=user
-    ).order_by('-date')[:30]
-    
-    if recent_logs.exists():
-        # Calculate symptom frequency
-        symptom_counts = {
-            'cramps': sum(1 for l in recent_logs if l.cramps),
-            'headache': sum(1 for l in recent_logs if l.headache),
-            'mood_swings': sum(1 for l in recent_logs if l.mood_swings),
-            'fatigue': sum(1 for l in recent_logs if l.fatigue),
-            'bloating': sum(1 for l in recent_logs if l.bloating),
+    # With at most RECENT_LOG_WINDOW logs the running counters cover exactly
+    # the recent window, so a single row fetch replaces the aggregation
+    counters = UserSymptomStats.objects.filter(user=user).first()
+    if counters is not None and counters.total <= RECENT_LOG_WINDOW:
+        # Flow scores: none=0, light=1, medium=2, heavy=3, anything else=2
+        other_flow = counters.total - (
+            counters.flow_none + counters.flow_light + counters.flow_medium + counters.flow_heavy
+        )
+        stats = {
+            'total': counters.total,
+            'cramps': counters.cramps,
+            'headache': counters.headache,
+            'mood_swings': counters.mood_swings,
+            'fatigue': counters.fatigue,
+            'bloating': counters.bloating,
+            'flow_avg': (
+                counters.flow_light + 2 * counters.flow_medium + 3 * counters.flow_heavy + 2 * other_flow
+            ) / counters.total if counters.total else None,
         }
+    else:
+        # Aggregate symptom frequency over the most recent logs in one query
+        recent_log_ids = DailyLog.objects.filter(
+            cycle__user=user
+        ).order_by('-date').values('id')[:RECENT_LOG_WINDOW]
         
-        total = len(recent_logs)
-        symptoms['cramps'] = symptom_counts['cramps'] > total * 0.3
-        symptoms['headache'] = symptom_counts['headache'] > total * 0.3
-        symptoms['mood_swings'] = symptom_counts['mood_swings'] > total * 0.3
-        symptoms['fatigue'] = symptom_counts['fatigue'] > total * 0.3
-        symptoms['bloating'] = symptom_counts['bloating'] > total * 0.3
+        stats = DailyLog.objects.filter(id__in=Subquery(recent_log_ids)).aggregate(
+            total=Count('id'),
+            cramps=Count('id', filter=Q(cramps=True)),
+            headache=Count('id', filter=Q(headache=True)),
+            mood_swings=Count('id', filter=Q(mood_swings=True)),
+            fatigue=Count('id', filter=Q(fatigue=True)),
+            bloating=Count('id', filter=Q(bloating=True)),
+            flow_avg=Avg(Case(
+                When(flow_intensity='none', then=Value(0)),
+                When(flow_intensity='light', then=Value(1)),
+                When(flow_intensity='medium', then=Value(2)),
+                When(flow_intensity='heavy', then=Value(3)),
+                default=Value(2),
+                output_field=IntegerField(),
+            )),
+        )
+    
+    total = stats['total']
+    if total:
+        symptoms['cramps'] = stats['cramps'] > total * 0.3
+        symptoms['headache'] = stats['headache'] > total * 0.3
+        symptoms['mood_swings'] = stats['mood_swings'] > total * 0.3
+        symptoms['fatigue'] = stats['fatigue'] > total * 0.3
+        symptoms['bloating'] = stats['bloating'] > total * 0.3
         
         # Flow intensity
-        flow_map = {'none': 0, 'light': 1, 'medium': 2, 'heavy': 3}
-        flows = [flow_map.get(l.flow_intensity, 2) for l in recent_logs]
-        if flows:
-            symptoms['flow_encoded'] = sum(flows) / len(flows)
+        symptoms['flow_encoded'] = stats['flow_avg']
     
     # Calculate average period length from completed cycles
-    if cycles.exists():
-        period_lengths = []
-        for cycle in cycles:
-            if cycle.end_date and cycle.start_date:
-                period_length = (cycle.end_date - cycle.start_date).days
-                if 1 <= period_length <= 10:  # Reasonable range
-                    period_lengths.append(period_length)
-        if period_lengths:
-            symptoms['period_length'] = sum(period_lengths) / len(period_lengths)
+    period = Cycle.objects.filter(
+        user=user,
+        end_date__isnull=False
+    ).annotate(
+        period_length=ExpressionWrapper(
+            F('end_date') - F('start_date'),
+            output_field=DurationField()
+        )
+    ).filter(
+        period_length__gte=timedelta(days=1),
+        period_length__lte=timedelta(days=10)  # Reasonable range
+    ).aggregate(avg=Avg('period_length'))
+    
+    if period['avg'] is not None:
+        symptoms['period_length'] = period['avg'] / timedelta(days=1)
     
     return cycle_lengths, symptoms
 
 
+def shared_cache_configured() -> bool:
+    """
+    Whether the default cache is shared between processes.
+    
+    The per-user version keys below are replaced by whichever process handles
+    a change. Django's default per-process memory cache never shows that to
+    other gunicorn workers, so callers fall back to data-derived keys then.
+    """
+    return settings.CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def get_user_data_state(user) -> str:
+    """
+    Summarize the state of a user's cycle data in a string that changes
+    whenever their cycles or daily logs change.
+    
+    Uses one aggregate query over the user's cycles and daily logs. Counts
+    catch deletions, latest update times catch edits.
+    
+    Args:
+        user: Django User object
+    
+    Returns:
+        State string, safe to use in cache keys
+    """
+    from .models import Cycle
+    
+    state = Cycle.objects.filter(user=user).aggregate(
+        cycle_count=Count('id', distinct=True),
+        cycle_updated=Max('updated_at'),
+        log_count=Count('daily_logs'),
+        log_updated=Max('daily_logs__updated_at'),
+    )
+    cycle_updated = state['cycle_updated'].timestamp() if state['cycle_updated'] else 0
+    log_updated = state['log_updated'].timestamp() if state['log_updated'] else 0
+    
+    return f"{state['cycle_count']}:{cycle_updated}:{state['log_count']}:{log_updated}"
+
+
+def get_prediction_cache_key(user) -> str:
+    """
+    Build a cache key that changes whenever the user's cycle data changes.
+    Today's date keeps days_until current.
+    
+    Args:
+        user: Django User object
+    
+    Returns:
+        Cache key string
+    """
+    return f"forecast:{user.pk}:{date.today().isoformat()}:{get_user_data_state(user)}"
+
+
+def get_prediction_version(user_id) -> str:
+    """
+    Current cache version for a user's prediction.
+    
+    Args:
+        user_id: Primary key of the user
+    
+    Returns:
+        Opaque version string, replaced by invalidate_cached_prediction()
+    """
+    return cache.get_or_set(f"forecast-version:{user_id}", lambda: uuid.uuid4().hex, None)
+
+
+def invalidate_cached_prediction(user_id):
+    """
+    Make any cached prediction for a user stale by moving to a new version.
+    
+    Args:
+        user_id: Primary key of the user
+    """
+    cache.set(f"forecast-version:{user_id}", uuid.uuid4().hex, None)
+
+
 def get_prediction_for_user(user) -> dict:
     """
     Get cycle prediction for a user.
     
+    Sources are tried cheapest first:
+    1. The cached prediction for the user's current version (no queries),
+       only with a shared cache
+    2. The stored prediction kept up to date by the signal handlers
+    3. Computing it on demand, cached by the state of the user's data
+    
+    Args:
+        user: Django User object
+    
+    Returns:
+        dict with prediction info (see compute_prediction_for_user)
+    """
+    from .models import UserPrediction
+    
+    forecast_key = None
+    if shared_cache_configured():
+        # Today's date keeps days_until current
+        forecast_key = f"forecast:{user.pk}:v{get_prediction_version(user.pk)}:{date.today().isoformat()}"
+        prediction = cache.get(forecast_key)
+        if prediction is not None:
+            return prediction
+    
+    stored = UserPrediction.objects.filter(user=user).first()
+    if stored is not None:
+        prediction = format_stored_prediction(stored)
+    else:
+        key = get_prediction_cache_key(user)
+        prediction = cache.get(key)
+        if prediction is None:
+            prediction = compute_prediction_for_user(user)
+            cache.set(key, prediction, PREDICTION_CACHE_TIMEOUT)
+    
+    if forecast_key is not None:
+        cache.set(forecast_key, prediction, PREDICTION_CACHE_TIMEOUT)
+    return prediction
+
+
+def get_prediction_etag(user) -> str:
+    """
+    ETag for a user's prediction that changes with their data and each day
+    (days_until changes daily).
+    
+    With a shared cache it is read from the prediction version (no queries);
+    otherwise it is derived from the user's data (one query).
+    
+    Args:
+        user: Django User object
+    
+    Returns:
+        ETag string
+    """
+    if shared_cache_configured():
+        return f"{get_prediction_version(user.pk)}-{date.today().isoformat()}"
+    return get_prediction_cache_key(user)
+
+
+def get_prediction_cached(request, user) -> dict:
+    """
+    Get a user's prediction at most once per request.
+    
+    Args:
+        request: Current HttpRequest, used to hold the memoized predictions
+        user: Django User object
+    
+    Returns:
+        A copy of the prediction dict (see compute_prediction_for_user), so
+        callers can reformat values without affecting later calls
+    """
+    if not hasattr(request, '_predictions'):
+        request._predictions = {}
+    if user.pk not in request._predictions:
+        request._predictions[user.pk] = get_prediction_for_user(user)
+    return dict(request._predictions[user.pk])
+
+
+def compute_prediction_for_user(user) -> dict:
+    """
+    Compute cycle prediction for a user.
+    
     Args:
         user: Django User object
     
@@ -97,7 +317,8 @@ def get_prediction_for_user(user) -> dict:
         - days_until: Days until predicted start
         - has_enough_data: Whether user has enough cycles for prediction
     """
-    cycle_lengths, symptoms = get_user_cycle_data(user)
+    cycles = get_user_cycles(user)
+    cycle_lengths, symptoms = get_user_cycle_data(user, cycles)
     
     # Check if user has enough data
     has_enough_data = len(cycle_lengths) >= 1
@@ -123,8 +344,7 @@ def get_prediction_for_user(user) -> dict:
     )
     
     # Calculate predicted date based on last cycle
-    from .models import Cycle
-    last_cycle = Cycle.objects.filter(user=user).order_by('-start_date').first()
+    last_cycle = cycles[-1] if cycles else None
     
     if last_cycle:
         if last_cycle.end_date:
@@ -160,3 +380,67 @@ def get_prediction_for_user(user) -> dict:
         'message': message,
         'cycle_count': len(cycle_lengths)
     }
+
+
+def refresh_user_prediction(user) -> dict:
+    """
+    Recompute a user's prediction and store it.
+    
+    Args:
+        user: Django User object
+    
+    Returns:
+        dict with prediction info (see compute_prediction_for_user)
+    """
+    from .models import UserPrediction
+    
+    prediction = compute_prediction_for_user(user)
+    UserPrediction.objects.update_or_create(
+        user=user,
+        defaults={
+            'predicted_length': prediction['predicted_length'],
+            'predicted_date': prediction['predicted_date'],
+            'confidence': prediction['confidence'],
+            'cycle_count': prediction.get('cycle_count', 0),
+            'message': prediction['message'],
+        }
+    )
+    invalidate_cached_prediction(user.pk)
+    return prediction
+
+
+def format_stored_prediction(stored) -> dict:
+    """
+    Convert a stored UserPrediction into the dict returned by
+    compute_prediction_for_user, recalculating days_until for today.
+    
+    Args:
+        stored: UserPrediction object
+    
+    Returns:
+        dict with prediction info
+    """
+    if stored.predicted_length is None:
+        return {
+            'predicted_length': None,
+            'predicted_date': None,
+            'confidence': 0,
+            'days_until': None,
+            'has_enough_data': False,
+            'message': stored.message
+        }
+    
+    if stored.predicted_date:
+        days_until = (stored.predicted_date - date.today()).days
+    else:
+        days_until = None
+    
+    return {
+        'predicted_length': stored.predicted_length,
+        'predicted_date': stored.predicted_date,
+        'confidence': stored.confidence,
+        'days_until': days_until,
+        'has_enough_data': True,
+        'message': stored.message,
+        'cycle_count': stored.cycle_count
+    }
@@ -0,0 +1,14 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from Tracker.stats_service import rebuild_symptom_stats
+
+
+class Command(BaseCommand):
+    help = "Recount every user's denormalized symptom statistics from their daily logs."
+
+    def handle(self, *args, **options):
+        user_ids = User.objects.values_list('pk', flat=True)
+        for user_id in user_ids.iterator():
+            rebuild_symptom_stats(user_id)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt symptom stats for {user_ids.count()} users"))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-15 03:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Tracker', '0002_cycle_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cycle',
+            index=models.Index(fields=['user', '-start_date'], name='cycle_user_start_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-15 04:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Tracker', '0003_cycle_cycle_user_start_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserPrediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('predicted_length', models.FloatField(blank=True, null=True)),
+                ('predicted_date', models.DateField(blank=True, null=True)),
+                ('confidence', models.FloatField(default=0)),
+                ('cycle_count', models.IntegerField(default=0)),
+                ('message', models.CharField(blank=True, max_length=100)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='prediction', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-15 04:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Tracker', '0004_userprediction'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSymptomStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.IntegerField(default=0)),
+                ('cramps', models.IntegerField(default=0)),
+                ('headache', models.IntegerField(default=0)),
+                ('mood_swings', models.IntegerField(default=0)),
+                ('fatigue', models.IntegerField(default=0)),
+                ('bloating', models.IntegerField(default=0)),
+                ('flow_none', models.IntegerField(default=0)),
+                ('flow_light', models.IntegerField(default=0)),
+                ('flow_medium', models.IntegerField(default=0)),
+                ('flow_heavy', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='symptom_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
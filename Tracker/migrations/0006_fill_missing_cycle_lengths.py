@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def fill_missing_cycle_lengths(apps, schema_editor):
+    """
+    Fix cycles saved with an end date but no length (before Cycle.save()
+    calculated it). This used to run on every analytics page load.
+    """
+    Cycle = apps.get_model('Tracker', 'Cycle')
+    UserPrediction = apps.get_model('Tracker', 'UserPrediction')
+
+    broken_cycles = list(
+        Cycle.objects.filter(cycle_length__isnull=True, end_date__isnull=False)
+        .only('start_date', 'end_date', 'user_id')
+    )
+    for cycle in broken_cycles:
+        cycle.cycle_length = (cycle.end_date - cycle.start_date).days
+    Cycle.objects.bulk_update(broken_cycles, ['cycle_length'], batch_size=500)
+
+    # bulk_update skips signals; drop stale stored predictions so they are recomputed
+    UserPrediction.objects.filter(user_id__in={c.user_id for c in broken_cycles}).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Tracker', '0005_usersymptomstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_missing_cycle_lengths, migrations.RunPython.noop),
+    ]
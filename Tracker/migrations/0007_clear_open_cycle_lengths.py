@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def clear_open_cycle_lengths(apps, schema_editor):
+    """
+    Clear lengths left on cycles whose end date was later removed.
+    Cycle.save() now keeps cycle_length in sync with end_date.
+    """
+    Cycle = apps.get_model('Tracker', 'Cycle')
+    UserPrediction = apps.get_model('Tracker', 'UserPrediction')
+
+    open_cycles = Cycle.objects.filter(end_date__isnull=True, cycle_length__isnull=False)
+    user_ids = set(open_cycles.values_list('user_id', flat=True))
+    open_cycles.update(cycle_length=None)
+
+    # update() skips signals; drop stale stored predictions so they are recomputed
+    UserPrediction.objects.filter(user_id__in=user_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Tracker', '0006_fill_missing_cycle_lengths'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_open_cycle_lengths, migrations.RunPython.noop),
+    ]
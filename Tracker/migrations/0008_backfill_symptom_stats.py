@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.db.models import Count, Q
+
+SYMPTOM_FIELDS = ['cramps', 'headache', 'mood_swings', 'fatigue', 'bloating']
+FLOW_LEVELS = ['none', 'light', 'medium', 'heavy']
+
+
+def backfill_symptom_stats(apps, schema_editor):
+    """
+    Recount every user's symptom counters from their daily logs.
+    Users with logs from before 0005 had no row, and rows rebuilt from a
+    cycle's pre_delete handler kept counting that cycle's deleted logs.
+    """
+    DailyLog = apps.get_model('Tracker', 'DailyLog')
+    UserSymptomStats = apps.get_model('Tracker', 'UserSymptomStats')
+
+    aggregates = {'total': Count('id')}
+    for field in SYMPTOM_FIELDS:
+        aggregates[field] = Count('id', filter=Q(**{field: True}))
+    for level in FLOW_LEVELS:
+        aggregates[f'flow_{level}'] = Count('id', filter=Q(flow_intensity=level))
+
+    # One grouped query for all users; order_by() drops the default ordering from the GROUP BY
+    per_user = DailyLog.objects.values('cycle__user_id').annotate(**aggregates).order_by()
+
+    UserSymptomStats.objects.all().delete()
+    UserSymptomStats.objects.bulk_create(
+        [
+            UserSymptomStats(user_id=counts.pop('cycle__user_id'), **counts)
+            for counts in per_user
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Tracker', '0007_clear_open_cycle_lengths'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_symptom_stats, migrations.RunPython.noop),
+    ]
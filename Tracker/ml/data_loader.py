@@ -52,53 +52,44 @@ def create_sample_data():
     np.random.seed(42)
     n_users = 50
     cycles_per_user = 12
-    
-    data = []
-    
-    for user_id in range(1, n_users + 1):
-        # Each user has a baseline cycle length (21-35 days is normal)
-        base_cycle_length = np.random.randint(24, 32)
-        # Period length (3-7 days is normal)
-        base_period_length = np.random.randint(3, 7)
-        
-        current_date = pd.Timestamp('2024-01-01') + pd.Timedelta(days=np.random.randint(0, 30))
-        
-        for cycle_num in range(cycles_per_user):
-            # Add some variation to cycle length (+/- 3 days)
-            cycle_length = base_cycle_length + np.random.randint(-3, 4)
-            cycle_length = max(21, min(35, cycle_length))  # Clamp to normal range
-            
-            period_length = base_period_length + np.random.randint(-1, 2)
-            period_length = max(2, min(8, period_length))
-            
-            # Symptoms (random but user-consistent)
-            has_cramps = np.random.random() > 0.3
-            has_headache = np.random.random() > 0.6
-            has_mood_swings = np.random.random() > 0.5
-            has_fatigue = np.random.random() > 0.4
-            has_bloating = np.random.random() > 0.5
-            
-            # Flow intensity
-            flow_choices = ['light', 'medium', 'heavy']
-            flow = np.random.choice(flow_choices, p=[0.2, 0.5, 0.3])
-            
-            data.append({
-                'user_id': user_id,
-                'cycle_start_date': current_date,
-                'cycle_length': cycle_length,
-                'period_length': period_length,
-                'flow_intensity': flow,
-                'cramps': has_cramps,
-                'headache': has_headache,
-                'mood_swings': has_mood_swings,
-                'fatigue': has_fatigue,
-                'bloating': has_bloating,
-                'age': 20 + (user_id % 20),  # Ages 20-39
-            })
-            
-            current_date = current_date + pd.Timedelta(days=cycle_length)
-    
-    df = pd.DataFrame(data)
+    shape = (n_users, cycles_per_user)
+    
+    user_ids = np.arange(1, n_users + 1)
+    
+    # Each user has a baseline cycle length (21-35 days is normal)
+    base_cycle_length = np.random.randint(24, 32, size=n_users)
+    # Period length (3-7 days is normal)
+    base_period_length = np.random.randint(3, 7, size=n_users)
+    start_offset = np.random.randint(0, 30, size=n_users)
+    
+    # Add some variation to cycle length (+/- 3 days), clamped to normal range
+    cycle_length = np.clip(base_cycle_length[:, None] + np.random.randint(-3, 4, size=shape), 21, 35)
+    period_length = np.clip(base_period_length[:, None] + np.random.randint(-1, 2, size=shape), 2, 8)
+    
+    # Each cycle starts where the previous one ended
+    days_since_first = np.cumsum(cycle_length, axis=1) - cycle_length
+    cycle_start_date = (
+        pd.Timestamp('2024-01-01')
+        + pd.to_timedelta((start_offset[:, None] + days_since_first).ravel(), unit='D')
+    )
+    
+    # Flow intensity
+    flow_choices = ['light', 'medium', 'heavy']
+    
+    df = pd.DataFrame({
+        'user_id': np.repeat(user_ids, cycles_per_user),
+        'cycle_start_date': cycle_start_date,
+        'cycle_length': cycle_length.ravel(),
+        'period_length': period_length.ravel(),
+        'flow_intensity': np.random.choice(flow_choices, size=shape, p=[0.2, 0.5, 0.3]).ravel(),
+        # Symptoms (random but user-consistent)
+        'cramps': (np.random.random(shape) > 0.3).ravel(),
+        'headache': (np.random.random(shape) > 0.6).ravel(),
+        'mood_swings': (np.random.random(shape) > 0.5).ravel(),
+        'fatigue': (np.random.random(shape) > 0.4).ravel(),
+        'bloating': (np.random.random(shape) > 0.5).ravel(),
+        'age': np.repeat(20 + (user_ids % 20), cycles_per_user),  # Ages 20-39
+    })
     return df
 
 
@@ -108,16 +99,17 @@ def preprocess_data(df):
     - Handle missing values
     - Create features for prediction
     - Normalize numerical features
-    """
-    df = df.copy()
     
+    The frame is modified in place (and returned); callers should pass
+    a frame they own.
+    """
     # Convert date columns to datetime if needed
     if 'cycle_start_date' in df.columns:
         df['cycle_start_date'] = pd.to_datetime(df['cycle_start_date'])
     
     # Handle missing values
     numeric_cols = df.select_dtypes(include=[np.number]).columns
-    df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].median())
+    df.loc[:, numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].median())
     
     # Convert boolean symptoms to int
     bool_cols = ['cramps', 'headache', 'mood_swings', 'fatigue', 'bloating']
@@ -137,29 +129,40 @@ def create_features(df):
     """
     Create features for cycle prediction.
     Uses rolling statistics and lag features.
-    """
-    df = df.copy()
     
+    Feature columns are added to the frame in place (and returned);
+    callers should pass a frame they own.
+    """
     # Sort by user and date
     if 'user_id' in df.columns and 'cycle_start_date' in df.columns:
         df = df.sort_values(['user_id', 'cycle_start_date'])
     
     # Group by user to calculate rolling features
     if 'user_id' in df.columns:
-        # Previous cycle lengths (lag features)
-        df['prev_cycle_length_1'] = df.groupby('user_id')['cycle_length'].shift(1)
-        df['prev_cycle_length_2'] = df.groupby('user_id')['cycle_length'].shift(2)
-        df['prev_cycle_length_3'] = df.groupby('user_id')['cycle_length'].shift(3)
+        # Previous cycle lengths (lag features), computed in one NumPy pass.
+        # A stable sort by user keeps each user's cycles contiguous and in order.
+        user_ids = df['user_id'].to_numpy()
+        order = np.argsort(user_ids, kind='stable')
+        sorted_ids = user_ids[order]
+        sorted_lengths = df['cycle_length'].to_numpy(dtype=np.float64)[order]
+        for lag in (1, 2, 3):
+            shifted = np.full(len(df), np.nan)
+            shifted[lag:] = sorted_lengths[:-lag]
+            # Only keep lags that come from the same user
+            shifted[lag:][sorted_ids[lag:] != sorted_ids[:-lag]] = np.nan
+            lagged = np.empty_like(shifted)
+            lagged[order] = shifted
+            df[f'prev_cycle_length_{lag}'] = lagged
+        
+        # Rolling window over the previous 3 cycles, computed on the lagged
+        # column so pandas' built-in groupby rolling can be used
+        rolling = df['prev_cycle_length_1'].groupby(df['user_id']).rolling(3, min_periods=1)
         
         # Rolling mean of last 3 cycles
-        df['rolling_mean_3'] = df.groupby('user_id')['cycle_length'].transform(
-            lambda x: x.rolling(3, min_periods=1).mean().shift(1)
-        )
+        df['rolling_mean_3'] = rolling.mean().reset_index(level=0, drop=True)
         
         # Rolling std of last 3 cycles (measure of regularity)
-        df['rolling_std_3'] = df.groupby('user_id')['cycle_length'].transform(
-            lambda x: x.rolling(3, min_periods=1).std().shift(1)
-        )
+        df['rolling_std_3'] = rolling.std().reset_index(level=0, drop=True)
         
         # Fill NaN with median
         df['rolling_std_3'] = df['rolling_std_3'].fillna(2)  # Default std
@@ -1,14 +1,16 @@
 """
 Cycle prediction model module.
-Uses Random Forest to predict next cycle length.
+Uses histogram-based gradient boosting (or Random Forest) to predict next cycle length.
 """
+import functools
+import operator
 import os
 import joblib
 import numpy as np
 from pathlib import Path
 
 try:
-    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
     from sklearn.model_selection import train_test_split
     from sklearn.metrics import mean_absolute_error, r2_score
     SKLEARN_AVAILABLE = True
@@ -21,37 +23,54 @@ def get_model_path():
     return Path(__file__).parent / 'models' / 'cycle_predictor.joblib'
 
 
-def train_model(X, y, test_size=0.2, random_state=42):
+def train_model(X, y, test_size=0.2, random_state=42, model_type=None):
     """
-    Train a Random Forest model for cycle length prediction.
+    Train a regression model for cycle length prediction.
     
     Args:
         X: Feature DataFrame/array
         y: Target array (cycle lengths)
         test_size: Fraction of data to use for testing
         random_state: Random seed for reproducibility
+        model_type: 'hist_gradient_boosting' or 'random_forest'.
+            Defaults to the CYCLE_MODEL_TYPE environment variable,
+            falling back to 'hist_gradient_boosting'.
     
     Returns:
-        model: Trained RandomForestRegressor
+        model: Trained regressor
         metrics: Dictionary with training metrics
     """
     if not SKLEARN_AVAILABLE:
         raise ImportError("scikit-learn is required. Install with: pip install scikit-learn")
     
+    if model_type is None:
+        model_type = os.environ.get('CYCLE_MODEL_TYPE', 'hist_gradient_boosting')
+    
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=test_size, random_state=random_state
     )
     
     # Train model
-    model = RandomForestRegressor(
-        n_estimators=100,
-        max_depth=10,
-        min_samples_split=5,
-        min_samples_leaf=2,
-        random_state=random_state,
-        n_jobs=-1
-    )
+    if model_type == 'hist_gradient_boosting':
+        # Histogram-binned boosting: much smaller on disk and faster to predict
+        model = HistGradientBoostingRegressor(
+            max_iter=200,
+            max_depth=6,
+            learning_rate=0.05,
+            random_state=random_state
+        )
+    elif model_type == 'random_forest':
+        model = RandomForestRegressor(
+            n_estimators=100,
+            max_depth=10,
+            min_samples_split=5,
+            min_samples_leaf=2,
+            random_state=random_state,
+            n_jobs=-1
+        )
+    else:
+        raise ValueError(f"Unknown model type: {model_type}")
     
     model.fit(X_train, y_train)
     
@@ -74,6 +93,7 @@ def train_model(X, y, test_size=0.2, random_state=42):
 def save_model(model, feature_names):
     """
     Save the trained model and feature names to disk.
+    The pickle is zlib-compressed to cut file size and cold-start I/O.
     
     Args:
         model: Trained model
@@ -88,18 +108,37 @@ def save_model(model, feature_names):
         'version': '1.0'
     }
     
-    joblib.dump(model_data, model_path)
+    joblib.dump(model_data, model_path, compress=3)
     print(f"Model saved to {model_path}")
 
 
+@functools.lru_cache(maxsize=1)
+def _load_model_cached(model_path, mtime):
+    """
+    Deserialize the model file once per (path, mtime) pair.
+    The mtime is part of the cache key so a retrained model is reloaded.
+    Also builds an itemgetter that pulls features in model order.
+    """
+    model_data = joblib.load(model_path)
+    feature_names = model_data['feature_names']
+    return model_data['model'], feature_names, operator.itemgetter(*feature_names)
+
+
 def load_model():
     """
     Load the trained model from disk.
+    The model is cached in memory after the first load.
     
     Returns:
         model: Trained model
         feature_names: List of feature column names
     """
+    model, feature_names, _ = _get_loaded_model()
+    return model, feature_names
+
+
+def _get_loaded_model():
+    """Return the cached (model, feature_names, feature_getter) triple."""
     model_path = get_model_path()
     
     if not model_path.exists():
@@ -108,8 +147,7 @@ def load_model():
             "Run 'python -m Tracker.ml.train' to train the model first."
         )
     
-    model_data = joblib.load(model_path)
-    return model_data['model'], model_data['feature_names']
+    return _load_model_cached(model_path, model_path.stat().st_mtime)
 
 
 def predict_cycle_length(features_dict):
@@ -123,29 +161,69 @@ def predict_cycle_length(features_dict):
         predicted_length: Predicted cycle length in days
         confidence: Confidence score (0-1)
     """
-    model, feature_names = load_model()
+    return predict_many([features_dict])[0]
+
+
+def predict_fast(features_dict):
+    """
+    Fast path of predict_cycle_length for a dict holding every model feature.
+    Values are pulled in model order with a precomputed itemgetter instead
+    of looking up each feature name.
     
-    # Prepare features array
-    features = []
-    for name in feature_names:
-        value = features_dict.get(name, 0)
-        if value is None:
-            value = 0
-        features.append(float(value))
+    Args:
+        features_dict: Dictionary with a non-None value for every feature
     
-    features_array = np.array(features).reshape(1, -1)
+    Returns:
+        predicted_length: Predicted cycle length in days
+        confidence: Confidence score (always 1.0, every feature is present)
+    
+    Raises:
+        KeyError: If a model feature is missing from features_dict
+    """
+    model, _, feature_getter = _get_loaded_model()
+    
+    features_array = np.asarray(feature_getter(features_dict), dtype=np.float64).reshape(1, -1)
+    
+    # Make prediction, clamped to reasonable range (21-40 days)
+    predicted_length = max(21, min(40, model.predict(features_array)[0]))
+    
+    return round(predicted_length, 1), 1.0
+
+
+def predict_many(features_dicts):
+    """
+    Predict cycle lengths for many feature sets with a single model call.
+    
+    Args:
+        features_dicts: List of dictionaries with feature values
+    
+    Returns:
+        List of (predicted_length, confidence) tuples, one per input
+    """
+    if not features_dicts:
+        return []
+    
+    model, feature_names = load_model()
+    n_features = len(feature_names)
     
-    # Make prediction
-    predicted_length = model.predict(features_array)[0]
+    # Build one (n_samples, n_features) array; missing/None values become 0
+    features_array = np.fromiter(
+        (float(d.get(name) or 0) for d in features_dicts for name in feature_names),
+        dtype=np.float64,
+        count=len(features_dicts) * n_features
+    ).reshape(len(features_dicts), n_features)
     
-    # Clamp to reasonable range (21-40 days)
-    predicted_length = max(21, min(40, predicted_length))
+    # Make predictions, clamped to reasonable range (21-40 days)
+    predicted_lengths = np.clip(model.predict(features_array), 21, 40)
     
-    # Calculate confidence based on feature availability
-    available_features = sum(1 for name in feature_names if features_dict.get(name) is not None)
-    confidence = available_features / len(feature_names)
+    results = []
+    for features_dict, predicted_length in zip(features_dicts, predicted_lengths):
+        # Calculate confidence based on feature availability
+        available_features = sum(1 for name in feature_names if features_dict.get(name) is not None)
+        confidence = available_features / n_features
+        results.append((round(predicted_length, 1), confidence))
     
-    return round(predicted_length, 1), confidence
+    return results
 
 
 def predict_with_history(cycle_lengths, user_age=25, symptoms=None):
@@ -164,19 +242,21 @@ def predict_with_history(cycle_lengths, user_age=25, symptoms=None):
     if symptoms is None:
         symptoms = {}
     
-    # Calculate rolling statistics from history
+    # Calculate rolling statistics from history.
+    # Windows hold at most 3 values, so plain arithmetic beats NumPy here.
     if len(cycle_lengths) >= 3:
         prev_1 = cycle_lengths[-1]
         prev_2 = cycle_lengths[-2]
         prev_3 = cycle_lengths[-3]
-        rolling_mean = np.mean(cycle_lengths[-3:])
-        rolling_std = np.std(cycle_lengths[-3:])
+        window = cycle_lengths[-3:]
+        rolling_mean = sum(window) / 3
+        rolling_std = (sum((x - rolling_mean) ** 2 for x in window) / 3) ** 0.5
     elif len(cycle_lengths) >= 2:
         prev_1 = cycle_lengths[-1]
         prev_2 = cycle_lengths[-2]
         prev_3 = cycle_lengths[-1]  # Fallback
-        rolling_mean = np.mean(cycle_lengths)
-        rolling_std = np.std(cycle_lengths) if len(cycle_lengths) > 1 else 2
+        rolling_mean = (prev_1 + prev_2) / 2
+        rolling_std = abs(prev_1 - prev_2) / 2
     elif len(cycle_lengths) == 1:
         prev_1 = prev_2 = prev_3 = cycle_lengths[0]
         rolling_mean = cycle_lengths[0]
@@ -204,9 +284,12 @@ def predict_with_history(cycle_lengths, user_age=25, symptoms=None):
     }
     
     try:
+        return predict_fast(features)
+    except KeyError:
+        # Model expects features not built here - use the general path
         return predict_cycle_length(features)
     except FileNotFoundError:
         # Model not trained yet - use simple average
         if cycle_lengths:
-            return round(np.mean(cycle_lengths), 1), 0.5
+            return round(sum(cycle_lengths) / len(cycle_lengths), 1), 0.5
         return 28.0, 0.3
@@ -28,7 +28,7 @@ def main():
         return 1
     
     # Step 2: Train model
-    print("\n[2/3] Training Random Forest model...")
+    print("\n[2/3] Training model...")
     try:
         model, metrics = train_model(X, y)
         print(f"     ✓ Training complete!")
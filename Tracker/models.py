@@ -2,6 +2,27 @@ from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+class DaysBetween(models.Func):
+    """Whole days from a start date to an end date, computed in the database."""
+    arity = 2
+    output_field = models.IntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # PostgreSQL: subtracting two dates yields an integer number of days
+        return super().as_sql(compiler, connection, template='(%(expressions)s)', arg_joiner=' - ', **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template='CAST(julianday(%(expressions)s) AS INTEGER)',
+            arg_joiner=') - julianday(',
+            **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='DATEDIFF', **extra_context)
+
+
 class Cycle(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cycles')  # ADD THIS LINE
     start_date = models.DateField()
@@ -13,6 +34,9 @@ class Cycle(models.Model):
 
     class Meta:
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['user', '-start_date'], name='cycle_user_start_idx'),
+        ]
 
     def __str__(self):
         return f"Cycle starting {self.start_date} - {self.user.username}"
@@ -21,6 +45,9 @@ class Cycle(models.Model):
         # Calculate cycle length if start and end dates are present
         if self.start_date and self.end_date:
             self.cycle_length = (self.end_date - self.start_date).days
+        else:
+            # An open (or reopened) cycle has no length yet
+            self.cycle_length = None
         super().save(*args, **kwargs)
 
 class DailyLog(models.Model):
@@ -51,4 +78,39 @@ class DailyLog(models.Model):
         unique_together = ['cycle', 'date']
 
     def __str__(self):
-        return f"Log for {self.date}"
\ No newline at end of file
+        return f"Log for {self.date}"
+
+class UserPrediction(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='prediction')
+    predicted_length = models.FloatField(null=True, blank=True)
+    predicted_date = models.DateField(null=True, blank=True)
+    confidence = models.FloatField(default=0)
+    cycle_count = models.IntegerField(default=0)
+    message = models.CharField(max_length=100, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Prediction for {self.user.username}"
+
+class UserSymptomStats(models.Model):
+    # Running totals over all of a user's daily logs, kept up to date by signals
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='symptom_stats')
+    total = models.IntegerField(default=0)
+
+    # Symptoms
+    cramps = models.IntegerField(default=0)
+    headache = models.IntegerField(default=0)
+    mood_swings = models.IntegerField(default=0)
+    fatigue = models.IntegerField(default=0)
+    bloating = models.IntegerField(default=0)
+
+    # Flow intensity
+    flow_none = models.IntegerField(default=0)
+    flow_light = models.IntegerField(default=0)
+    flow_medium = models.IntegerField(default=0)
+    flow_heavy = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Symptom stats for {self.user.username}"
@@ -0,0 +1,193 @@
+"""
+Signal handlers that keep derived per-user data up to date.
+
+- Stored predictions are refreshed after the surrounding transaction commits,
+  on a Celery worker when one is configured or inline otherwise. Reads keep
+  serving the previous prediction until the refresh lands.
+- Symptom counters are adjusted in place with F() expressions as daily logs
+  are created, edited and deleted.
+- Cached analytics figures are dropped as soon as the change commits.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Cycle, DailyLog
+from .stats_service import (
+    SYMPTOM_FIELDS, apply_symptom_stats_delta, invalidate_cached_stats, log_counts,
+    symptom_count_aggregates,
+)
+from .tasks import background_tasks_enabled, recompute_prediction
+
+
+def _refresh_queued(user_id):
+    """
+    Whether a refresh for this user is already waiting on the current
+    transaction. Django drops the callbacks of rolled back savepoints from
+    run_on_commit, so a rollback never leaves a refresh marked as queued.
+    
+    This reads connection.run_on_commit, a private Django attribute whose
+    entries have changed shape before (they are (savepoint ids, callback,
+    robust) tuples as of Django 4.2). Each entry is searched for the tagged
+    callback instead of being unpacked, and if the attribute goes away this
+    only stops the deduplication: refreshes are idempotent, so the worst
+    case is a duplicate refresh, never a missed one.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return False
+    return any(
+        getattr(item, 'prediction_user_id', None) == user_id
+        for entry in getattr(connection, 'run_on_commit', ())
+        for item in (entry if isinstance(entry, tuple) else (entry,))
+    )
+
+
+def _origin_model(origin):
+    """
+    Model whose deletion set off a delete signal. origin is an instance for
+    Model.delete() and a QuerySet for queryset deletes (e.g. the admin's
+    "delete selected" action).
+    """
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+def _batch_lookup(origin, name, build):
+    """
+    Per-batch lookup for queryset deletes, built once and kept on the QuerySet
+    being deleted so each instance's signal doesn't query again.
+    
+    Args:
+        origin: QuerySet whose delete() sent the signals
+        name: Attribute name to keep the lookup under
+        build: Callable returning the lookup dict
+    """
+    if not hasattr(origin, name):
+        setattr(origin, name, build())
+    return getattr(origin, name)
+
+
+def _deleted_log_user_id(instance, origin):
+    """Owner of a daily log being deleted, without a query per log in a batch."""
+    if DailyLog.cycle.is_cached(instance):
+        return instance.cycle.user_id
+    if isinstance(origin, QuerySet):
+        owners = _batch_lookup(origin, '_cycle_user_ids', lambda: dict(
+            origin.values_list('cycle_id', 'cycle__user_id').distinct().order_by()
+        ))
+        if instance.cycle_id in owners:
+            return owners[instance.cycle_id]
+    return instance.cycle.user_id
+
+
+def _deleted_cycle_log_counts(instance, origin):
+    """Counter totals of a cycle's daily logs, one query per batch of cycles."""
+    if isinstance(origin, QuerySet):
+        counts = _batch_lookup(origin, '_cycle_log_counts', lambda: {
+            row.pop('cycle_id'): row
+            for row in DailyLog.objects.filter(cycle__in=origin.values('pk'))
+            .values('cycle_id').annotate(**symptom_count_aggregates()).order_by()
+        })
+        return counts.get(instance.pk, {})
+    return instance.daily_logs.aggregate(**symptom_count_aggregates())
+
+
+def schedule_prediction_refresh(user_id):
+    """
+    Queue a prediction refresh for a user once the current transaction commits.
+    Several changes in the same transaction only trigger one refresh. The
+    user's cached analytics figures are invalidated at the same time.
+    
+    Args:
+        user_id: Primary key of the user whose data changed
+    """
+    if _refresh_queued(user_id):
+        return
+    
+    def refresh():
+        invalidate_cached_stats(user_id)
+        if background_tasks_enabled():
+            recompute_prediction.delay(user_id)
+        else:
+            recompute_prediction(user_id)
+    
+    refresh.prediction_user_id = user_id
+    transaction.on_commit(refresh)
+
+
+@receiver(post_save, sender=Cycle)
+def cycle_saved(sender, instance, **kwargs):
+    schedule_prediction_refresh(instance.user_id)
+
+
+@receiver(post_delete, sender=Cycle)
+def cycle_deleted(sender, instance, origin=None, **kwargs):
+    # Nothing to refresh when the whole user is being deleted
+    if issubclass(_origin_model(origin), User):
+        return
+    schedule_prediction_refresh(instance.user_id)
+
+
+@receiver(pre_save, sender=DailyLog)
+def daily_log_remember_counts(sender, instance, **kwargs):
+    # Remember the stored values so only the difference is applied after saving
+    instance._previous_stats = None
+    if instance.pk:
+        instance._previous_stats = DailyLog.objects.filter(pk=instance.pk).values(
+            *SYMPTOM_FIELDS, 'flow_intensity', 'cycle__user_id'
+        ).first()
+
+
+@receiver(post_save, sender=DailyLog)
+def daily_log_update_stats(sender, instance, **kwargs):
+    user_id = instance.cycle.user_id
+    counts = log_counts(vars(instance))
+    previous = getattr(instance, '_previous_stats', None)
+    
+    if previous is None:
+        apply_symptom_stats_delta(user_id, counts)
+    elif previous['cycle__user_id'] == user_id:
+        previous_counts = log_counts(previous)
+        apply_symptom_stats_delta(user_id, {k: counts[k] - previous_counts[k] for k in counts})
+    else:
+        # Log moved to another user's cycle
+        previous_counts = log_counts(previous)
+        apply_symptom_stats_delta(previous['cycle__user_id'], {k: -v for k, v in previous_counts.items()})
+        apply_symptom_stats_delta(user_id, counts)
+        schedule_prediction_refresh(previous['cycle__user_id'])
+    
+    # Scheduled after the counters change: outside a transaction the refresh
+    # runs immediately and reads them
+    schedule_prediction_refresh(user_id)
+
+
+@receiver(pre_delete, sender=DailyLog)
+def daily_log_remember_user(sender, instance, origin=None, **kwargs):
+    # Cascaded deletes are handled by the cycle (or user) being deleted
+    if issubclass(_origin_model(origin), (Cycle, User)):
+        return
+    instance._stats_user_id = _deleted_log_user_id(instance, origin)
+
+
+@receiver(post_delete, sender=DailyLog)
+def daily_log_remove_stats(sender, instance, origin=None, **kwargs):
+    # Cascaded deletes are handled by the cycle (or user) being deleted
+    if issubclass(_origin_model(origin), (Cycle, User)):
+        return
+    apply_symptom_stats_delta(
+        instance._stats_user_id,
+        {k: -v for k, v in log_counts(vars(instance)).items()},
+        rebuild_missing=False,
+    )
+    schedule_prediction_refresh(instance._stats_user_id)
+
+
+@receiver(pre_delete, sender=Cycle)
+def cycle_remove_stats(sender, instance, origin=None, **kwargs):
+    # The user's stats row goes away with the user
+    if issubclass(_origin_model(origin), User):
+        return
+    delta = {name: -count for name, count in _deleted_cycle_log_counts(instance, origin).items()}
+    apply_symptom_stats_delta(instance.user_id, delta, rebuild_missing=False)
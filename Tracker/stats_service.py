@@ -0,0 +1,177 @@
+"""
+Symptom statistics service.
+Maintains the denormalized per-user symptom counters in UserSymptomStats
+and caches the figures shown on the analytics page.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .forecast_service import get_user_data_state, shared_cache_configured
+
+SYMPTOM_FIELDS = ['cramps', 'headache', 'mood_swings', 'fatigue', 'bloating']
+FLOW_LEVELS = ['none', 'light', 'medium', 'heavy']
+
+# How long cached analytics figures are kept (seconds)
+ANALYTICS_CACHE_TIMEOUT = 3600
+
+
+def log_counts(values: dict) -> dict:
+    """
+    Counter contributions of a single daily log.
+    
+    Args:
+        values: Dict with the log's symptom fields and flow_intensity
+    
+    Returns:
+        Dict mapping UserSymptomStats counter names to 0/1
+    """
+    counts = {'total': 1}
+    for field in SYMPTOM_FIELDS:
+        counts[field] = 1 if values[field] else 0
+    for level in FLOW_LEVELS:
+        counts[f'flow_{level}'] = 1 if values['flow_intensity'] == level else 0
+    return counts
+
+
+def apply_symptom_stats_delta(user_id, delta: dict, rebuild_missing: bool = True):
+    """
+    Atomically add a delta to a user's counters with F() expressions.
+    
+    Args:
+        user_id: Primary key of the user
+        delta: Dict mapping counter names to the amount to add
+        rebuild_missing: Rebuild the user's row from their logs if it doesn't
+            exist yet. Delete handlers pass False: their logs may still be
+            about to go, and the user may be being deleted.
+    """
+    from .models import UserSymptomStats
+    
+    changes = {name: F(name) + value for name, value in delta.items() if value}
+    if not changes:
+        return
+    
+    updated = UserSymptomStats.objects.filter(user_id=user_id).update(
+        updated_at=timezone.now(), **changes
+    )
+    if not updated and rebuild_missing:
+        rebuild_symptom_stats(user_id)
+
+
+def symptom_count_aggregates() -> dict:
+    """
+    Aggregate expressions counting daily logs per symptom and flow level.
+    Pass to DailyLog.objects.filter(...).aggregate(**...) to get every
+    UserSymptomStats counter in one query.
+    
+    Returns:
+        Dict mapping counter names to Count expressions
+    """
+    aggregates = {'total': Count('id')}
+    for field in SYMPTOM_FIELDS:
+        aggregates[field] = Count('id', filter=Q(**{field: True}))
+    for level in FLOW_LEVELS:
+        aggregates[f'flow_{level}'] = Count('id', filter=Q(flow_intensity=level))
+    return aggregates
+
+
+def rebuild_symptom_stats(user_id):
+    """
+    Recount a user's symptom statistics from all of their daily logs.
+    
+    Args:
+        user_id: Primary key of the user
+    
+    Returns:
+        The up to date UserSymptomStats object
+    """
+    from .models import DailyLog, UserSymptomStats
+    
+    counts = DailyLog.objects.filter(cycle__user_id=user_id).aggregate(**symptom_count_aggregates())
+    stats, _ = UserSymptomStats.objects.update_or_create(user_id=user_id, defaults=counts)
+    return stats
+
+
+def get_stats_version(user_id) -> str:
+    """
+    Current cache version for a user's analytics figures.
+    
+    Args:
+        user_id: Primary key of the user
+    
+    Returns:
+        Opaque version string, replaced by invalidate_cached_stats()
+    """
+    return cache.get_or_set(f"stats-version:{user_id}", lambda: uuid.uuid4().hex, None)
+
+
+def invalidate_cached_stats(user_id):
+    """
+    Make any cached analytics figures for a user stale by moving to a new version.
+    
+    Args:
+        user_id: Primary key of the user
+    """
+    cache.set(f"stats-version:{user_id}", uuid.uuid4().hex, None)
+
+
+def get_analytics_stats(user) -> dict:
+    """
+    Cycle history and symptom statistics for the analytics page.
+    Cached per user until their cycles or daily logs change: by version with
+    a shared cache, by the state of their data otherwise.
+    
+    Args:
+        user: Django User object
+    
+    Returns:
+        dict with cycles, avg/min/max_cycle_length, symptom_stats and flow_stats
+    """
+    from .models import Cycle, UserSymptomStats
+    
+    if shared_cache_configured():
+        key = f"analytics:{user.pk}:v{get_stats_version(user.pk)}"
+    else:
+        # Versions in a per-process cache aren't seen by other workers
+        key = f"analytics:{user.pk}:{get_user_data_state(user)}"
+    stats = cache.get(key)
+    if stats is not None:
+        return stats
+    
+    # All user cycles (only the columns the history table and chart use)
+    cycles = list(
+        Cycle.objects.filter(user=user)
+        .only('start_date', 'end_date', 'cycle_length')
+        .order_by('-start_date')
+    )
+    
+    # Calculate statistics from the loaded cycles that have lengths
+    lengths = [c.cycle_length for c in cycles if c.cycle_length is not None]
+    
+    # Symptom and flow counts come from the user's counters row, which the
+    # signal handlers keep current; users without one get it rebuilt
+    counters = UserSymptomStats.objects.filter(user=user).first()
+    if counters is None:
+        counters = rebuild_symptom_stats(user.pk)
+    total_logs = counters.total
+    
+    symptom_stats = {'total_logs': total_logs}
+    for field in SYMPTOM_FIELDS:
+        symptom_stats[f'{field}_count'] = getattr(counters, field)
+    # Percentages
+    for field in SYMPTOM_FIELDS:
+        symptom_stats[f'{field}_pct'] = round(getattr(counters, field) / total_logs * 100) if total_logs else 0
+    
+    stats = {
+        'cycles': cycles,
+        'avg_cycle_length': sum(lengths) / len(lengths) if lengths else 0,
+        'min_cycle_length': min(lengths) if lengths else 0,
+        'max_cycle_length': max(lengths) if lengths else 0,
+        'symptom_stats': symptom_stats,
+        # Flow intensity breakdown
+        'flow_stats': {level: getattr(counters, f'flow_{level}') for level in FLOW_LEVELS},
+    }
+    cache.set(key, stats, ANALYTICS_CACHE_TIMEOUT)
+    return stats
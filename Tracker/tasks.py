@@ -0,0 +1,58 @@
+"""
+Background tasks for keeping stored predictions up to date.
+Uses Celery when it is installed and a broker and shared cache are
+configured; otherwise callers refresh predictions inline.
+"""
+from django.conf import settings
+from django.core import checks
+from django.contrib.auth.models import User
+
+from .forecast_service import refresh_user_prediction, shared_cache_configured
+
+# Try to import Celery, fallback to inline refreshes if not available
+try:
+    from celery import shared_task
+    CELERY_AVAILABLE = True
+except ImportError:
+    CELERY_AVAILABLE = False
+
+
+def background_tasks_enabled():
+    """
+    Whether predictions should be refreshed on a Celery worker.
+    Needs a shared cache so the worker's invalidation reaches the web processes.
+    """
+    return (
+        CELERY_AVAILABLE
+        and bool(getattr(settings, 'CELERY_BROKER_URL', None))
+        and shared_cache_configured()
+    )
+
+
+@checks.register()
+def check_background_tasks(app_configs, **kwargs):
+    """Warn when a broker is configured but ignored for lack of a shared cache."""
+    if CELERY_AVAILABLE and getattr(settings, 'CELERY_BROKER_URL', None) and not shared_cache_configured():
+        return [checks.Warning(
+            'CELERY_BROKER_URL is set but the cache is per-process, so predictions '
+            'are refreshed inline instead of on a Celery worker.',
+            hint='Set CACHE_URL to a shared cache such as Redis.',
+            id='Tracker.W001',
+        )]
+    return []
+
+
+def recompute_prediction(user_id):
+    """
+    Recompute and store a user's prediction.
+    
+    Args:
+        user_id: Primary key of the user
+    """
+    user = User.objects.filter(pk=user_id).first()
+    if user is not None:
+        refresh_user_prediction(user)
+
+
+if CELERY_AVAILABLE:
+    recompute_prediction = shared_task(ignore_result=True)(recompute_prediction)
@@ -1,3 +1,288 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from importlib import import_module
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+
+from backend import urls
+
+from . import tasks
+from .forecast_service import compute_prediction_for_user, get_prediction_etag
+from .models import Cycle, DailyLog, UserPrediction, UserSymptomStats
+from .stats_service import get_analytics_stats, symptom_count_aggregates
+
+try:
+    from zeal import zeal_context
+    ZEAL_AVAILABLE = True
+except ImportError:
+    ZEAL_AVAILABLE = False
+
+
+class PredictionRefreshSchedulingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'password123')
+
+    def test_changes_in_one_transaction_queue_one_refresh(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                Cycle.objects.create(user=self.user, start_date=date(2024, 1, 1))
+                Cycle.objects.create(user=self.user, start_date=date(2024, 1, 29))
+        self.assertEqual(len(callbacks), 1)
+
+    def test_rolled_back_change_does_not_suppress_later_refreshes(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    Cycle.objects.create(user=self.user, start_date=date(2024, 1, 1))
+                    raise RuntimeError
+            Cycle.objects.create(user=self.user, start_date=date(2024, 1, 29))
+        self.assertEqual(len(callbacks), 1)
+
+
+class SymptomStatsSignalTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'password123')
+        self.cycle = Cycle.objects.create(user=self.user, start_date=date(2024, 1, 1), end_date=date(2024, 1, 28))
+        self.other_cycle = Cycle.objects.create(user=self.user, start_date=date(2024, 1, 29))
+        self.logs = [
+            DailyLog.objects.create(cycle=self.cycle, date=date(2024, 1, 1), flow_intensity='heavy', cramps=True),
+            DailyLog.objects.create(cycle=self.cycle, date=date(2024, 1, 2), flow_intensity='medium', headache=True),
+            DailyLog.objects.create(cycle=self.other_cycle, date=date(2024, 1, 29), flow_intensity='light'),
+        ]
+
+    def assertStatsMatchLogs(self, user):
+        expected = DailyLog.objects.filter(cycle__user=user).aggregate(**symptom_count_aggregates())
+        stats = UserSymptomStats.objects.get(user=user)
+        self.assertEqual({name: getattr(stats, name) for name in expected}, expected)
+
+    def test_create(self):
+        stats = UserSymptomStats.objects.get(user=self.user)
+        self.assertEqual((stats.total, stats.cramps, stats.headache, stats.flow_heavy), (3, 1, 1, 1))
+        self.assertStatsMatchLogs(self.user)
+
+    def test_edit(self):
+        log = self.logs[0]
+        log.cramps = False
+        log.fatigue = True
+        log.flow_intensity = 'none'
+        log.save()
+        self.assertStatsMatchLogs(self.user)
+
+    def test_move_log_to_another_users_cycle(self):
+        bob = User.objects.create_user('bob', 'bob@example.com', 'password123')
+        bob_cycle = Cycle.objects.create(user=bob, start_date=date(2024, 1, 1))
+        log = self.logs[0]
+        log.cycle = bob_cycle
+        log.save()
+        self.assertStatsMatchLogs(self.user)
+        self.assertStatsMatchLogs(bob)
+
+    def test_instance_delete(self):
+        self.logs[1].delete()
+        self.assertStatsMatchLogs(self.user)
+
+    def test_cascade_delete(self):
+        self.cycle.delete()
+        self.assertStatsMatchLogs(self.user)
+
+    def test_log_queryset_delete(self):
+        DailyLog.objects.filter(cycle=self.cycle).delete()
+        self.assertStatsMatchLogs(self.user)
+
+    def test_cycle_queryset_delete(self):
+        Cycle.objects.filter(pk=self.cycle.pk).delete()
+        self.assertStatsMatchLogs(self.user)
+
+    def test_user_delete(self):
+        self.user.delete()
+        self.assertFalse(UserSymptomStats.objects.filter(user_id=self.user.pk).exists())
+
+    def test_user_queryset_delete(self):
+        user_id = self.user.pk
+        User.objects.filter(pk=user_id).delete()
+        self.assertFalse(UserSymptomStats.objects.filter(user_id=user_id).exists())
+        self.assertFalse(DailyLog.objects.filter(cycle__user_id=user_id).exists())
+
+    def count_selects(self, delete):
+        with CaptureQueriesContext(connection) as queries:
+            delete()
+        return sum(query['sql'].startswith('SELECT') for query in queries)
+
+    def test_queryset_deletes_read_owners_once_per_batch(self):
+        def add_cycles(count):
+            for i in range(count):
+                cycle = Cycle.objects.create(user=self.user, start_date=date(2023, 1 + i, 1))
+                for day in (1, 2, 3):
+                    DailyLog.objects.create(cycle=cycle, date=date(2023, 1 + i, day))
+        
+        add_cycles(1)
+        one_cycle_logs = self.count_selects(lambda: DailyLog.objects.filter(date__year=2023).delete())
+        add_cycles(4)
+        four_cycles_logs = self.count_selects(lambda: DailyLog.objects.filter(date__year=2023).delete())
+        self.assertEqual(one_cycle_logs, four_cycles_logs)
+        
+        add_cycles(1)
+        one_cycle = self.count_selects(lambda: Cycle.objects.filter(start_date__year=2023).delete())
+        add_cycles(4)
+        four_cycles = self.count_selects(lambda: Cycle.objects.filter(start_date__year=2023).delete())
+        self.assertEqual(one_cycle, four_cycles)
+        self.assertStatsMatchLogs(self.user)
+
+    def test_delete_without_stats_row_is_not_counted_later(self):
+        UserSymptomStats.objects.filter(user=self.user).delete()
+        self.cycle.delete()
+        self.assertFalse(UserSymptomStats.objects.filter(user=self.user).exists())
+        DailyLog.objects.create(cycle=self.other_cycle, date=date(2024, 1, 29) + timedelta(days=1))
+        self.assertStatsMatchLogs(self.user)
+
+
+class BackfillSymptomStatsMigrationTests(TestCase):
+    def test_recounts_missing_and_wrong_rows(self):
+        alice = User.objects.create_user('alice', 'alice@example.com', 'password123')
+        bob = User.objects.create_user('bob', 'bob@example.com', 'password123')
+        for user in (alice, bob):
+            cycle = Cycle.objects.create(user=user, start_date=date(2024, 1, 1))
+            DailyLog.objects.create(cycle=cycle, date=date(2024, 1, 1), flow_intensity='heavy', cramps=True)
+            DailyLog.objects.create(cycle=cycle, date=date(2024, 1, 2), headache=True)
+        UserSymptomStats.objects.filter(user=alice).update(total=8, cramps=5)
+        UserSymptomStats.objects.filter(user=bob).delete()
+        
+        migration = import_module('Tracker.migrations.0008_backfill_symptom_stats')
+        migration.backfill_symptom_stats(apps, None)
+        
+        for user in (alice, bob):
+            expected = DailyLog.objects.filter(cycle__user=user).aggregate(**symptom_count_aggregates())
+            stats = UserSymptomStats.objects.get(user=user)
+            self.assertEqual({name: getattr(stats, name) for name in expected}, expected)
+
+
+@mock.patch.object(tasks, 'CELERY_AVAILABLE', True)
+@override_settings(CELERY_BROKER_URL='redis://localhost:6379/0')
+class BackgroundTasksTests(TestCase):
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_per_process_cache_keeps_refreshes_inline(self):
+        self.assertFalse(tasks.background_tasks_enabled())
+        self.assertEqual([w.id for w in tasks.check_background_tasks(None)], ['Tracker.W001'])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/1',
+    }})
+    def test_shared_cache_enables_worker(self):
+        self.assertTrue(tasks.background_tasks_enabled())
+        self.assertEqual(tasks.check_background_tasks(None), [])
+
+
+class StoredPredictionTests(TransactionTestCase):
+    # Outside a transaction the refresh runs as soon as the signal fires, so
+    # this checks it only runs after the symptom counters were updated
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'password123')
+        Cycle.objects.create(user=self.user, start_date=date(2024, 1, 1), end_date=date(2024, 1, 29))
+        Cycle.objects.create(user=self.user, start_date=date(2024, 1, 30), end_date=date(2024, 2, 27))
+        self.cycle = Cycle.objects.create(user=self.user, start_date=date(2024, 2, 28))
+
+    def assertStoredPredictionCurrent(self):
+        stored = UserPrediction.objects.get(user=self.user)
+        self.assertEqual(stored.predicted_length, compute_prediction_for_user(self.user)['predicted_length'])
+
+    def test_log_create_edit_and_delete(self):
+        log = DailyLog.objects.create(cycle=self.cycle, date=date(2024, 2, 28), flow_intensity='heavy')
+        self.assertStoredPredictionCurrent()
+        
+        for field in ('cramps', 'headache', 'fatigue', 'bloating'):
+            setattr(log, field, True)
+        log.flow_intensity = 'light'
+        log.save()
+        self.assertStoredPredictionCurrent()
+        
+        log.delete()
+        self.assertStoredPredictionCurrent()
+
+
+class CycleCreateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'password123')
+        self.client.force_login(self.user)
+
+    def create_cycle(self, start_date):
+        response = self.client.post('/cycles/create/', {'start_date': start_date.isoformat(), 'notes': ''})
+        self.assertEqual(response.status_code, 302)
+
+    def test_closes_latest_open_cycle(self):
+        open_cycle = Cycle.objects.create(user=self.user, start_date=date(2024, 1, 1))
+        updated_at = open_cycle.updated_at
+        self.create_cycle(date(2024, 1, 29))
+        open_cycle.refresh_from_db()
+        self.assertEqual((open_cycle.end_date, open_cycle.cycle_length), (date(2024, 1, 28), 27))
+        self.assertGreater(open_cycle.updated_at, updated_at)
+
+    def test_leaves_older_open_cycles_alone(self):
+        old_open = Cycle.objects.create(user=self.user, start_date=date(2024, 1, 1))
+        Cycle.objects.create(user=self.user, start_date=date(2024, 2, 1), end_date=date(2024, 2, 28))
+        self.create_cycle(date(2024, 3, 1))
+        old_open.refresh_from_db()
+        self.assertEqual((old_open.end_date, old_open.cycle_length), (None, None))
+
+    def test_backdated_cycle_does_not_close_later_cycle(self):
+        later = Cycle.objects.create(user=self.user, start_date=date(2024, 3, 1))
+        self.create_cycle(date(2024, 2, 1))
+        later.refresh_from_db()
+        self.assertIsNone(later.end_date)
+
+
+# Invalidations handled by another process never reach a per-process cache
+@mock.patch('Tracker.signals.invalidate_cached_stats')
+@mock.patch('Tracker.forecast_service.invalidate_cached_prediction')
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PerProcessCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'password123')
+        self.cycle = Cycle.objects.create(user=self.user, start_date=date(2024, 1, 1))
+
+    def test_analytics_follow_data_changes(self, *mocks):
+        self.assertEqual(get_analytics_stats(self.user)['symptom_stats']['total_logs'], 0)
+        DailyLog.objects.create(cycle=self.cycle, date=date(2024, 1, 1), cramps=True)
+        self.assertEqual(get_analytics_stats(self.user)['symptom_stats']['total_logs'], 1)
+
+    def test_forecast_etag_follows_data_changes(self, *mocks):
+        etag = get_prediction_etag(self.user)
+        DailyLog.objects.create(cycle=self.cycle, date=date(2024, 1, 1), cramps=True)
+        self.assertNotEqual(get_prediction_etag(self.user), etag)
+
+
+@skipUnless(ZEAL_AVAILABLE, 'django-zeal is not installed (see requirements-dev.txt)')
+@override_settings(ZEAL_RAISE=True)
+class NPlusOneTests(TestCase):
+    """Load every URL in backend/urls.py with N+1 detection set to fail."""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser('alice', 'alice@example.com', 'password123')
+        for month in (1, 2, 3):
+            cycle = Cycle.objects.create(
+                user=self.user, start_date=date(2024, month, 1), end_date=date(2024, month, 27)
+            )
+            for day in (1, 2, 3):
+                log = DailyLog.objects.create(cycle=cycle, date=date(2024, month, day), cramps=True)
+        self.url_kwargs = {'pk': cycle.pk, 'cycle_pk': cycle.pk, 'log_pk': log.pk}
+        self.client.force_login(self.user)
+
+    def get_urls(self):
+        for pattern in urls.urlpatterns:
+            if isinstance(pattern, URLResolver):
+                yield f'/{pattern.pattern}'
+            elif isinstance(pattern, URLPattern):
+                kwargs = {name: self.url_kwargs[name] for name in pattern.pattern.converters}
+                yield reverse(pattern.name, kwargs=kwargs)
+
+    def test_no_n_plus_one_queries(self):
+        # Logging out ends the session, so that URL goes last
+        for url in sorted(self.get_urls(), key=lambda url: url == reverse('logout')):
+            with self.subTest(url=url), zeal_context():
+                response = self.client.get(url)
+                self.assertLess(response.status_code, 400)
@@ -1,12 +1,19 @@
+from datetime import date, timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import DateField, F, Prefetch, Subquery, Value
 from django.http import JsonResponse
-from .models import Cycle, DailyLog
+from django.utils import timezone
+from django.views.decorators.http import condition
+from .models import Cycle, DailyLog, DaysBetween
 from .forms import CycleForm, DailyLogForm
-from .forecast_service import get_prediction_for_user
+from .forecast_service import get_prediction_cached, get_prediction_etag
+from .stats_service import get_analytics_stats
 
 # ========== AUTHENTICATION VIEWS ==========
 
@@ -65,31 +72,34 @@ def user_register(request):
 
 @login_required(login_url='login')
 def home(request):
-    # Filter cycles by logged-in user only
-    cycles = Cycle.objects.filter(user=request.user)[:5]
-    total_cycles = Cycle.objects.filter(user=request.user).count()
-
+    # Filter cycles by logged-in user only; fetched once and reused below.
+    # Only the columns the dashboard and stats read are loaded.
+    user_cycles = list(
+        Cycle.objects.filter(user=request.user)
+        .only('start_date', 'end_date', 'cycle_length')
+        .order_by('-start_date')
+    )
+    latest_cycle = user_cycles[0] if user_cycles else None
+    cycles = user_cycles[:5]
+    total_cycles = len(user_cycles)
     
-    # Calculate actual stats
-    all_cycles = Cycle.objects.filter(user=request.user, cycle_length__isnull=False)
-    if all_cycles.exists():
-        avg_length = sum(c.cycle_length for c in all_cycles) / all_cycles.count()
-        avg_cycle = f"{avg_length:.0f} days"
-        days_tracked = sum(c.cycle_length for c in all_cycles if c.cycle_length)
+    # Calculate actual stats from the cycles already loaded
+    lengths = [c.cycle_length for c in user_cycles if c.cycle_length is not None]
+    if lengths:
+        days_tracked = sum(lengths)
+        avg_cycle = f"{days_tracked / len(lengths):.0f} days"
     else:
         avg_cycle = "N/A"
         days_tracked = 0
     
     # Calculate current day in cycle
-    last_cycle = Cycle.objects.filter(user=request.user).order_by('-start_date').first()
-    if last_cycle and not last_cycle.end_date:
-        from datetime import date
-        current_day = (date.today() - last_cycle.start_date).days + 1
+    if latest_cycle and not latest_cycle.end_date:
+        current_day = (date.today() - latest_cycle.start_date).days + 1
     else:
         current_day = "-"
     
     # Get forecast prediction
-    forecast = get_prediction_for_user(request.user)
+    forecast = get_prediction_cached(request, request.user)
     
     context = {
         'cycles': cycles,
@@ -109,16 +119,26 @@ def cycle_create(request):
         form = CycleForm(request.POST)
         if form.is_valid():
             cycle = form.save(commit=False)
-            # Automatically close the previous cycle if it's still open
-            previous_cycle = Cycle.objects.filter(user=request.user).order_by('-start_date').first()
-            if previous_cycle and not previous_cycle.end_date:
-                from datetime import timedelta
-                # Set end date to the day before the new cycle starts
-                previous_cycle.end_date = cycle.start_date - timedelta(days=1)
-                previous_cycle.save()  # This will now auto-calculate length
-            
-            cycle.user = request.user  # Assign current user
-            cycle.save()
+            # Save both cycles together so the stored prediction is refreshed once
+            with transaction.atomic():
+                # Automatically close the latest cycle if it's still open,
+                # ending it the day before the new cycle starts. Done in one
+                # UPDATE, with the length calculated by the database as save() would.
+                # update() skips auto_now, so updated_at is set explicitly.
+                previous_end_date = cycle.start_date - timedelta(days=1)
+                latest_cycle = Cycle.objects.filter(user=request.user).order_by('-start_date').values('pk')[:1]
+                Cycle.objects.filter(
+                    pk=Subquery(latest_cycle),
+                    end_date__isnull=True,
+                    start_date__lt=cycle.start_date
+                ).update(
+                    end_date=previous_end_date,
+                    cycle_length=DaysBetween(Value(previous_end_date, output_field=DateField()), F('start_date')),
+                    updated_at=timezone.now()
+                )
+                
+                cycle.user = request.user  # Assign current user
+                cycle.save()
             messages.success(request, 'Cycle created successfully!')
             return redirect('home')
     else:
@@ -129,8 +149,14 @@ def cycle_create(request):
 @login_required(login_url='login')
 def cycle_detail(request, pk):
     # Only allow user to see their own cycles
-    cycle = get_object_or_404(Cycle, pk=pk, user=request.user)
-    daily_logs = cycle.daily_logs.all().order_by('-date')
+    cycle = get_object_or_404(
+        Cycle.objects.prefetch_related(
+            Prefetch('daily_logs', queryset=DailyLog.objects.order_by('-date'))
+        ),
+        pk=pk,
+        user=request.user
+    )
+    daily_logs = cycle.daily_logs.all()  # Served from the prefetch cache
     return render(request, 'pages/cycle_detail.html', {'cycle': cycle, 'daily_logs': daily_logs})
 
 @login_required(login_url='login')
@@ -162,13 +188,20 @@ def cycle_delete(request, pk):
 
 # ========== FORECAST API ==========
 
+def forecast_etag(request):
+    """ETag for the forecast API (see get_prediction_etag)."""
+    return get_prediction_etag(request.user)
+
+
 @login_required(login_url='login')
+@condition(etag_func=forecast_etag)
 def forecast_view(request):
     """
     API endpoint to get cycle forecast prediction.
-    Returns JSON with prediction data.
+    Returns JSON with prediction data, or 304 Not Modified when the client's
+    If-None-Match still matches.
     """
-    forecast = get_prediction_for_user(request.user)
+    forecast = get_prediction_cached(request, request.user)
     
     # Convert date to string for JSON serialization
     if forecast.get('predicted_date'):
@@ -184,84 +217,16 @@ def analytics_view(request):
     """
     Analytics page showing cycle history, charts, and predictions.
     """
-    # Get all user cycles
-    # Self-healing: Fix existing cycles with end dates but no length
-    # This addresses the user's current issue where they have data but it's not processing
-    broken_cycles = Cycle.objects.filter(user=request.user, cycle_length__isnull=True, end_date__isnull=False)
-    for broken_cycle in broken_cycles:
-        broken_cycle.save()  # Triggers the new calculate logic in model.save()
-
-    # Get all user cycles
-    cycles = Cycle.objects.filter(user=request.user).order_by('-start_date')
-    
-    # Get cycles with lengths for statistics
-    complete_cycles = Cycle.objects.filter(
-        user=request.user, 
-        cycle_length__isnull=False
-    )
-    
-    # Calculate statistics
-    if complete_cycles.exists():
-        lengths = [c.cycle_length for c in complete_cycles]
-        avg_cycle_length = sum(lengths) / len(lengths)
-        min_cycle_length = min(lengths)
-        max_cycle_length = max(lengths)
-    else:
-        avg_cycle_length = 0
-        min_cycle_length = 0
-        max_cycle_length = 0
+    # Cycle and symptom statistics, cached until the user's data changes
+    context = dict(get_analytics_stats(request.user))
     
     # Get forecast
-    forecast = get_prediction_for_user(request.user)
+    forecast = get_prediction_cached(request, request.user)
     
     # Convert confidence to percentage for display
     if forecast.get('confidence'):
         forecast['confidence'] = forecast['confidence'] * 100
-    
-    # Calculate symptom statistics from daily logs
-    all_logs = DailyLog.objects.filter(cycle__user=request.user)
-    total_logs = all_logs.count()
-    
-    symptom_stats = {
-        'total_logs': total_logs,
-        'cramps_count': all_logs.filter(cramps=True).count(),
-        'headache_count': all_logs.filter(headache=True).count(),
-        'mood_swings_count': all_logs.filter(mood_swings=True).count(),
-        'fatigue_count': all_logs.filter(fatigue=True).count(),
-        'bloating_count': all_logs.filter(bloating=True).count(),
-    }
-    
-    # Calculate percentages
-    if total_logs > 0:
-        symptom_stats['cramps_pct'] = round(symptom_stats['cramps_count'] / total_logs * 100)
-        symptom_stats['headache_pct'] = round(symptom_stats['headache_count'] / total_logs * 100)
-        symptom_stats['mood_swings_pct'] = round(symptom_stats['mood_swings_count'] / total_logs * 100)
-        symptom_stats['fatigue_pct'] = round(symptom_stats['fatigue_count'] / total_logs * 100)
-        symptom_stats['bloating_pct'] = round(symptom_stats['bloating_count'] / total_logs * 100)
-    else:
-        symptom_stats['cramps_pct'] = 0
-        symptom_stats['headache_pct'] = 0
-        symptom_stats['mood_swings_pct'] = 0
-        symptom_stats['fatigue_pct'] = 0
-        symptom_stats['bloating_pct'] = 0
-    
-    # Flow intensity breakdown
-    flow_stats = {
-        'none': all_logs.filter(flow_intensity='none').count(),
-        'light': all_logs.filter(flow_intensity='light').count(),
-        'medium': all_logs.filter(flow_intensity='medium').count(),
-        'heavy': all_logs.filter(flow_intensity='heavy').count(),
-    }
-    
-    context = {
-        'cycles': cycles,
-        'forecast': forecast,
-        'avg_cycle_length': avg_cycle_length,
-        'min_cycle_length': min_cycle_length,
-        'max_cycle_length': max_cycle_length,
-        'symptom_stats': symptom_stats,
-        'flow_stats': flow_stats,
-    }
+    context['forecast'] = forecast
     
     return render(request, 'pages/analytics.html', context)
 
@@ -282,7 +247,6 @@ def daily_log_create(request, cycle_pk):
             messages.success(request, 'Daily log added successfully!')
             return redirect('cycle_detail', pk=cycle.pk)
     else:
-        from datetime import date
         form = DailyLogForm(initial={'date': date.today()})
     
     return render(request, 'pages/daily_log_form.html', {
@@ -295,8 +259,14 @@ def daily_log_create(request, cycle_pk):
 @login_required(login_url='login')
 def daily_log_update(request, cycle_pk, log_pk):
     """Update a daily log entry."""
-    cycle = get_object_or_404(Cycle, pk=cycle_pk, user=request.user)
-    daily_log = get_object_or_404(DailyLog, pk=log_pk, cycle=cycle)
+    # Fetch the log and its cycle in one query, checking ownership via the join
+    daily_log = get_object_or_404(
+        DailyLog.objects.select_related('cycle'),
+        pk=log_pk,
+        cycle_id=cycle_pk,
+        cycle__user=request.user
+    )
+    cycle = daily_log.cycle
     
     if request.method == 'POST':
         form = DailyLogForm(request.POST, instance=daily_log)
@@ -318,8 +288,14 @@ def daily_log_update(request, cycle_pk, log_pk):
 @login_required(login_url='login')
 def daily_log_delete(request, cycle_pk, log_pk):
     """Delete a daily log entry."""
-    cycle = get_object_or_404(Cycle, pk=cycle_pk, user=request.user)
-    daily_log = get_object_or_404(DailyLog, pk=log_pk, cycle=cycle)
+    # Fetch the log and its cycle in one query, checking ownership via the join
+    daily_log = get_object_or_404(
+        DailyLog.objects.select_related('cycle'),
+        pk=log_pk,
+        cycle_id=cycle_pk,
+        cycle__user=request.user
+    )
+    cycle = daily_log.cycle
     
     if request.method == 'POST':
         daily_log.delete()
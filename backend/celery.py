@@ -0,0 +1,16 @@
+"""
+Celery app for the backend project.
+
+Only used when Celery is installed and CELERY_BROKER_URL is set; see
+Tracker.tasks for the fallback when it is not.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+app = Celery('backend')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -58,6 +58,23 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# N+1 query detection (development only, optional)
+# With django-zeal installed, related objects lazily loaded one row at a time
+# are reported as warnings. Set ZEAL_RAISE=True (e.g. in CI) to fail instead.
+# Install it with requirements-dev.txt; Tracker.tests.NPlusOneTests loads
+# every URL with it enabled.
+if DEBUG:
+    try:
+        import zeal  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        INSTALLED_APPS.append('zeal')
+        MIDDLEWARE.append('zeal.middleware.zeal_middleware')
+        ZEAL_RAISE = os.environ.get('ZEAL_RAISE', 'False').lower() in ('true', '1', 'yes')
+        # logout() reloads the session row itself; not an N+1 in this app
+        ZEAL_ALLOWLIST = [{'model': 'sessions.Session'}]
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -81,15 +98,45 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connections are reused across requests for CONN_MAX_AGE seconds. Set it to 0
+# when running behind a transaction-pooling proxy such as PgBouncer.
 DATABASES = {
     'default': dj_database_url.config(
         default=f'sqlite:///{BASE_DIR / "db.sqlite3"}',
-        conn_max_age=600,
+        conn_max_age=int(os.environ.get('CONN_MAX_AGE', 600)),
         conn_health_checks=True,
     )
 }
 
 
+# Cache
+# With a shared cache, forecasts, analytics figures and the forecast API's
+# ETag are keyed by per-user versions that whichever process handles a change
+# replaces, so warm reads need no queries. Django's default in-memory cache is
+# per process and other gunicorn workers would never see a new version, so
+# without CACHE_URL these keys are derived from the user's data instead (one
+# query per read, correct with any number of workers). Set CACHE_URL (e.g.
+# redis://host:6379/1, needs the redis package) to share one cache.
+
+CACHE_URL = os.environ.get('CACHE_URL')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+
+
+# Celery (optional)
+# When Celery is installed and a broker is configured, predictions are
+# recomputed on a worker instead of in the request that changed the data.
+# This also requires CACHE_URL, since the worker has to invalidate the web
+# processes' cached forecasts; otherwise predictions are refreshed inline.
+
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 